@@ -1,196 +1,258 @@
-from googleapiclient.discovery import build
+from collections import defaultdict
 from datetime import datetime
-import json
+from functools import lru_cache
+import argparse
+import asyncio
 import os
+import orjson
 from dotenv import load_dotenv
+from youtube_client import create_client, get_channel_id, get_channel_info, open_cache, produce_pages
 
+# Load environment variables
+load_dotenv()
+
+# Get configuration from environment variables
+API_KEY = os.getenv('YOUTUBE_API_KEY')
+CHANNEL_URL = os.getenv('YOUTUBE_CHANNEL_URL')
+
+OUTPUT_BUFFER_SIZE = 1 << 20
+PAGE_QUEUE_SIZE = 2
+HEADER_SEPARATOR = '=' * 50 + '\n'
+VIDEO_SEPARATOR = '-' * 50 + '\n\n'
+MONTH_NAMES = (
+    'January', 'February', 'March', 'April', 'May', 'June',
+    'July', 'August', 'September', 'October', 'November', 'December'
+)
+
+@lru_cache(maxsize=4096)
 def parse_youtube_date(date_str):
     """
     Parse YouTube date string handling both formats with and without microseconds
     """
-    try:
-        # Try parsing with microseconds
-        return datetime.strptime(date_str.split('.')[0] + 'Z', '%Y-%m-%dT%H:%M:%SZ')
-    except ValueError:
-        # Try parsing without microseconds
-        return datetime.strptime(date_str, '%Y-%m-%dT%H:%M:%SZ')
+    return datetime.fromisoformat(date_str.rstrip('Z'))
 
-def get_channel_id(youtube, channel_url):
+def format_date(date):
     """
-    Get channel ID using different methods until successful.
+    Format a date like "April 07, 2021" without going through the locale-aware strftime
     """
-    channel_username = channel_url.split('@')[1]
+    return f"{MONTH_NAMES[date.month - 1]} {date.day:02d}, {date.year}"
+
+def write_channel_header(f, channel_info, channel_url):
+    """
+    Write the channel information section of the output file
+    """
+    created = format_date(parse_youtube_date(channel_info['publishedAt']))
     
-    # Method 1: Try direct username lookup
-    try:
-        response = youtube.channels().list(
-            part='id',
-            forUsername=channel_username
-        ).execute()
-        
-        if response.get('items'):
-            return response['items'][0]['id']
-    except Exception:
-        pass
+    f.write(
+        f"Channel Information: {channel_info['title']}\n"
+        f"{HEADER_SEPARATOR}\n"
+        f"Channel URL: {channel_url}\n"
+        f"Created: {created}\n"
+        f"Subscribers: {int(channel_info['subscriberCount']):,}\n"
+        f"Total Views: {int(channel_info['viewCount']):,}\n"
+        f"Total Videos: {int(channel_info['videoCount']):,}\n"
+        f"Country: {channel_info['country']}\n\n"
+        "Channel Description:\n"
+        f"{channel_info['description']}\n\n"
+        # Separator between channel info and videos
+        f"{HEADER_SEPARATOR}"
+        "Videos\n"
+        f"{HEADER_SEPARATOR}\n"
+    )
+
+def get_video_data(item):
+    """
+    Extract the video details used in the output from a playlist item
+    """
+    video_id = item['snippet']['resourceId']['videoId']
+    return {
+        'title': item['snippet']['title'],
+        'description': item['snippet']['description'],
+        'publishedAt': item['snippet']['publishedAt'],
+        'videoId': video_id,
+        'url': f'https://www.youtube.com/watch?v={video_id}'
+    }
+
+def write_videos(f, videos):
+    """
+    Write a batch of video records to the output file
+    """
+    records = [
+        f"Title: {video['title']}\n"
+        f"Posted: {format_date(parse_youtube_date(video['publishedAt']))}\n"
+        f"URL: {video['url']}\n"
+        f"Description:\n{video['description']}\n"
+        f"{VIDEO_SEPARATOR}"
+        for video in videos
+    ]
+    f.writelines(records)
+
+def write_videos_jsonl(f, videos):
+    """
+    Write a batch of videos to a binary output file as JSON lines
+    """
+    f.writelines(orjson.dumps(video, option=orjson.OPT_APPEND_NEWLINE) for video in videos)
+
+async def fetch_playlist_videos(client, api_key, playlist_id, f, write_page=write_videos, cache=None, verbose=False, channel_url=None):
+    """
+    Fetch all videos in a playlist and write them to the output file as they arrive.
+    Pages are downloaded by a producer task while the items of already received
+    pages are written with write_page, and the number of videos written is returned.
+    Progress lines are prefixed with channel_url when one is given.
+    """
+    prefix = f"[{channel_url}] " if channel_url else ""
+    count = 0
+    queue = asyncio.Queue(maxsize=PAGE_QUEUE_SIZE)
+    producer = asyncio.create_task(produce_pages(client, api_key, playlist_id, queue, cache))
     
-    # Method 2: Try channel search
     try:
-        response = youtube.search().list(
-            part='snippet',
-            q=channel_username,
-            type='channel',
-            maxResults=1
-        ).execute()
+        while (page := await queue.get()) is not None:
+            videos = [get_video_data(item) for item in page.get('items', [])]
+            write_page(f, videos)
+            count += len(videos)
+            
+            if verbose:
+                print(f"{prefix}Fetched {count} videos...")
         
-        if response.get('items'):
-            return response['items'][0]['snippet']['channelId']
-    except Exception:
-        pass
+        await producer
+    finally:
+        # Stop fetching pages nobody will write when the consumer fails
+        if not producer.done():
+            producer.cancel()
+            
+            # Make room for the sentinel the cancelled producer queues on its way out
+            while not queue.empty():
+                queue.get_nowait()
+            await asyncio.gather(producer, return_exceptions=True)
     
-    raise ValueError(f"Could not find channel ID for {channel_url}")
+    return count
 
-def get_channel_info(youtube, channel_id):
+async def fetch_channel(client, api_key, channel_url, output_file, output_format='text', verbose=False, channel_locks=None):
     """
-    Get detailed channel information
+    Look up a channel and stream its information and uploaded videos to the output file.
+    The jsonl format only contains the videos, one JSON object per line.
+    channel_locks maps channel IDs to locks shared by concurrent runs in the same batch.
     """
-    response = youtube.channels().list(
-        part='snippet,statistics,contentDetails',
-        id=channel_id
-    ).execute()
+    # Get channel ID using improved method
+    channel_id = await get_channel_id(client, api_key, channel_url)
+    print(f"[{channel_url}] Found channel ID: {channel_id}")
+    
+    # Different URLs can resolve to the same channel, whose cache may only be open once
+    lock = channel_locks[channel_id] if channel_locks is not None else asyncio.Lock()
     
-    if not response.get('items'):
-        raise ValueError("Could not fetch channel information")
+    async with lock:
+        return await fetch_channel_videos(client, api_key, channel_url, channel_id, output_file, output_format, verbose)
+
+async def fetch_channel_videos(client, api_key, channel_url, channel_id, output_file, output_format='text', verbose=False):
+    """
+    Stream the information and uploaded videos of a looked up channel to the output file
+    """
+    with open_cache(channel_id) as cache:
+        # Get channel information
+        channel_info = await get_channel_info(client, api_key, channel_id, cache)
+        print(f"[{channel_url}] Fetched channel info for: {channel_info['title']}")
         
-    channel_data = response['items'][0]
-    return {
-        'title': channel_data['snippet']['title'],
-        'description': channel_data['snippet']['description'],
-        'customUrl': channel_data['snippet'].get('customUrl', 'N/A'),
-        'publishedAt': channel_data['snippet']['publishedAt'],
-        'viewCount': channel_data['statistics']['viewCount'],
-        'subscriberCount': channel_data['statistics']['subscriberCount'],
-        'videoCount': channel_data['statistics']['videoCount'],
-        'country': channel_data['snippet'].get('country', 'N/A')
-    }
+        # Get playlist ID for channel uploads
+        playlist_id = channel_info['uploadsPlaylistId']
+        print(f"[{channel_url}] Found uploads playlist ID: {playlist_id}")
+        
+        if output_format == 'jsonl':
+            with open(output_file, 'wb', buffering=OUTPUT_BUFFER_SIZE) as f:
+                return await fetch_playlist_videos(client, api_key, playlist_id, f, write_videos_jsonl, cache, verbose, channel_url)
+        
+        with open(output_file, 'w', encoding='utf-8', buffering=OUTPUT_BUFFER_SIZE) as f:
+            write_channel_header(f, channel_info, channel_url)
+            
+            # Fetch and write all video details
+            return await fetch_playlist_videos(client, api_key, playlist_id, f, write_videos, cache, verbose, channel_url)
 
-def get_channel_videos():
+async def save_channel_videos(client, channel_url, output_format='text', verbose=False, channel_locks=None):
     """
-    Fetch all videos from a YouTube channel and save their details to a text file.
-    Uses environment variables for configuration.
+    Fetch all videos from a YouTube channel and save their details to a text or JSON lines file
     """
-    # Load environment variables
-    load_dotenv()
+    # Extract channel username from URL
+    _, _, channel_username = channel_url.partition('@')
+    if not channel_username:
+        raise ValueError(f"Could not extract channel username from {channel_url}")
     
-    # Get configuration from environment variables
-    API_KEY = os.getenv('YOUTUBE_API_KEY')
-    CHANNEL_URL = os.getenv('YOUTUBE_CHANNEL_URL')
+    # Create output directory if it doesn't exist
+    output_dir = 'output'
+    os.makedirs(output_dir, exist_ok=True)
     
-    if not API_KEY or not CHANNEL_URL:
-        raise ValueError("Missing required environment variables. Please check your .env file.")
+    # Fetch channel information and stream all video details to a partial file,
+    # which only replaces the output file once every page has been written
+    extension = 'jsonl' if output_format == 'jsonl' else 'txt'
+    output_file = os.path.join(output_dir, f'{channel_username}_videos.{extension}')
+    partial_file = f'{output_file}.part'
+    try:
+        video_count = await fetch_channel(client, API_KEY, channel_url, partial_file, output_format, verbose, channel_locks)
+    except BaseException:
+        if os.path.exists(partial_file):
+            os.remove(partial_file)
+        raise
     
-    # Extract channel username from URL
-    channel_username = CHANNEL_URL.split('@')[1]
+    if not video_count:
+        os.remove(partial_file)
+        print(f"No videos found for channel {channel_url}")
+        return 0
     
-    # Create YouTube API client
-    youtube = build('youtube', 'v3', developerKey=API_KEY)
+    os.replace(partial_file, output_file)
+    return video_count
+
+async def main(channel_urls, output_format='text', verbose=False):
+    """
+    Save the videos of several channels concurrently over one shared HTTP/2 client.
+    Returns a dict mapping each channel URL to its video count, or to the exception
+    that channel failed with. URLs for the same handle are only processed once.
+    """
+    if not API_KEY:
+        raise ValueError("Missing YOUTUBE_API_KEY environment variable. Please check your .env file.")
     
-    # Get channel ID using improved method
-    channel_id = get_channel_id(youtube, CHANNEL_URL)
-    print(f"Found channel ID: {channel_id}")
-    
-    # Get channel information
-    channel_info = get_channel_info(youtube, channel_id)
-    print(f"Fetched channel info for: {channel_info['title']}")
-    
-    # Get playlist ID for channel uploads
-    playlist_response = youtube.channels().list(
-        part='contentDetails',
-        id=channel_id
-    ).execute()
-    
-    if not playlist_response.get('items'):
-        raise ValueError(f"Could not find upload playlist for channel {channel_username}")
-    
-    playlist_id = playlist_response['items'][0]['contentDetails']['relatedPlaylists']['uploads']
-    print(f"Found uploads playlist ID: {playlist_id}")
-    
-    # Fetch all video details
-    videos = []
-    next_page_token = None
-    
-    while True:
-        try:
-            playlist_items = youtube.playlistItems().list(
-                part='snippet',
-                playlistId=playlist_id,
-                maxResults=50,
-                pageToken=next_page_token
-            ).execute()
-            
-            for item in playlist_items['items']:
-                video_id = item['snippet']['resourceId']['videoId']
-                video_data = {
-                    'title': item['snippet']['title'],
-                    'description': item['snippet']['description'],
-                    'publishedAt': item['snippet']['publishedAt'],
-                    'videoId': video_id,
-                    'url': f'https://www.youtube.com/watch?v={video_id}'
-                }
-                videos.append(video_data)
-                print(f"Found video: {video_data['title']}")
-            
-            next_page_token = playlist_items.get('nextPageToken')
-            if not next_page_token:
-                break
-                
-        except Exception as e:
-            print(f"Error fetching playlist items: {str(e)}")
-            break
-    
-    if not videos:
-        print("No videos found for this channel")
-        return 0
+    if not channel_urls or not all(channel_urls):
+        raise ValueError("No channel URL given. Pass channel URLs or set YOUTUBE_CHANNEL_URL in your .env file.")
     
-    # Create output directory if it doesn't exist
-    output_dir = 'output'
-    os.makedirs(output_dir, exist_ok=True)
+    # Handles are case-insensitive, and two tasks for the same handle would
+    # write the same output file concurrently
+    unique_urls = {}
+    for channel_url in channel_urls:
+        unique_urls.setdefault(channel_url.partition('@')[2].casefold() or channel_url, channel_url)
+    channel_urls = list(unique_urls.values())
     
-    # Save to text file
-    output_file = os.path.join(output_dir, f'{channel_username}_videos.txt')
-    with open(output_file, 'w', encoding='utf-8') as f:
-        # Write channel information
-        f.write(f"Channel Information: {channel_info['title']}\n")
-        f.write("=" * 50 + "\n\n")
-        f.write(f"Channel URL: {CHANNEL_URL}\n")
-        f.write(f"Created: {parse_youtube_date(channel_info['publishedAt']).strftime('%B %d, %Y')}\n")
-        f.write(f"Subscribers: {int(channel_info['subscriberCount']):,}\n")
-        f.write(f"Total Views: {int(channel_info['viewCount']):,}\n")
-        f.write(f"Total Videos: {int(channel_info['videoCount']):,}\n")
-        f.write(f"Country: {channel_info['country']}\n\n")
-        f.write("Channel Description:\n")
-        f.write(f"{channel_info['description']}\n\n")
-        
-        # Separator between channel info and videos
-        f.write("=" * 50 + "\n")
-        f.write("Videos\n")
-        f.write("=" * 50 + "\n\n")
-        
-        # Write video information
-        for video in videos:
-            formatted_date = parse_youtube_date(video['publishedAt']).strftime('%B %d, %Y')
-            
-            f.write(f"Title: {video['title']}\n")
-            f.write(f"Posted: {formatted_date}\n")
-            f.write(f"URL: {video['url']}\n")
-            f.write(f"Description:\n{video['description']}\n")
-            f.write("-" * 50 + "\n\n")
+    channel_locks = defaultdict(asyncio.Lock)
+    
+    async with create_client() as client:
+        results = await asyncio.gather(
+            *(save_channel_videos(client, channel_url, output_format, verbose, channel_locks) for channel_url in channel_urls),
+            return_exceptions=True
+        )
+    
+    return dict(zip(channel_urls, results))
+
+def get_channel_videos(channel_url=None, output_format='text', verbose=False):
+    """
+    Fetch all videos from a YouTube channel and save their details to a text or JSON lines file.
+    Uses environment variables for configuration unless a channel URL is given.
+    """
+    [result] = asyncio.run(main([channel_url or CHANNEL_URL], output_format, verbose)).values()
+    if isinstance(result, Exception):
+        raise result
     
-    return len(videos)
+    return result
 
 if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Save the details of all videos of YouTube channels to files.")
+    parser.add_argument('channel_urls', nargs='*', metavar='channel_url', help="channel URL to extract (default: YOUTUBE_CHANNEL_URL)")
+    parser.add_argument('--format', choices=('text', 'jsonl'), default='text', help="output file format (default: text)")
+    parser.add_argument('--verbose', action='store_true', help="print progress after every page of videos")
+    args = parser.parse_args()
+    
     try:
-        video_count = get_channel_videos()
-        if video_count > 0:
-            print(f"\nSuccessfully saved information for {video_count} videos.")
+        results = asyncio.run(main(args.channel_urls or [CHANNEL_URL], args.format, args.verbose))
+        
+        for channel_url, result in results.items():
+            if isinstance(result, Exception):
+                print(f"An error occurred for {channel_url}: {str(result)}")
+            elif result > 0:
+                print(f"\nSuccessfully saved information for {result} videos from {channel_url}.")
     except Exception as e:
         print(f"An error occurred: {str(e)}")
\ No newline at end of file
@@ -0,0 +1,248 @@
+from urllib.parse import urlencode
+import asyncio
+import os
+import random
+import shelve
+import httpx
+import orjson
+
+API_BASE_URL = 'https://www.googleapis.com/youtube/v3'
+MAX_CONCURRENT_REQUESTS = 10
+CACHE_DIR = os.path.join(os.path.expanduser('~'), '.cache', 'youtube-extractor')
+MAX_ATTEMPTS = 5
+MAX_RETRY_DELAY = 60
+RETRY_STATUS_CODES = (429, 500, 502, 503, 504)
+RETRY_ERROR_REASONS = ('rateLimitExceeded', 'userRateLimitExceeded')
+
+class YouTubeAPIError(Exception):
+    """
+    Error response from the YouTube Data API with the reason and message it reported
+    """
+    def __init__(self, status_code, reason, message):
+        detail = f"{status_code} {reason}" if reason else str(status_code)
+        super().__init__(f"YouTube API error ({detail}): {message}")
+        self.status_code = status_code
+        self.reason = reason
+        self.message = message
+
+def create_client():
+    """
+    Create the HTTP/2 client shared by all API requests
+    """
+    limits = httpx.Limits(max_connections=MAX_CONCURRENT_REQUESTS)
+    return httpx.AsyncClient(http2=True, limits=limits)
+
+def open_cache(channel_id):
+    """
+    Open the on-disk response cache for a channel
+    """
+    os.makedirs(CACHE_DIR, exist_ok=True)
+    return shelve.open(os.path.join(CACHE_DIR, f'{channel_id}.db'))
+
+def get_api_error(response):
+    """
+    Get the error reason and message from an API error response,
+    falling back to the HTTP reason phrase when the body has none
+    """
+    try:
+        error = orjson.loads(response.content)['error']
+        errors = error.get('errors') or [{}]
+        return errors[0].get('reason'), error.get('message') or response.reason_phrase
+    except (orjson.JSONDecodeError, KeyError, TypeError, AttributeError):
+        return None, response.reason_phrase
+
+def is_retryable(response):
+    """
+    Check whether an error response is transient. Rate limiting is reported
+    as 403 with a rateLimitExceeded reason, unlike the daily quotaExceeded.
+    """
+    if response.status_code in RETRY_STATUS_CODES:
+        return True
+    
+    return response.status_code == 403 and get_api_error(response)[0] in RETRY_ERROR_REASONS
+
+def get_retry_delay(attempt, response=None):
+    """
+    Get the number of seconds to wait before retrying a failed request.
+    Uses the Retry-After header when the API sends one, otherwise exponential backoff with jitter.
+    """
+    retry_after = response.headers.get('Retry-After', '') if response is not None else ''
+    if retry_after.isdigit():
+        return int(retry_after)
+    
+    return 2 ** attempt + random.random()
+
+async def api_get(client, api_key, resource, params, cache=None):
+    """
+    Issue a GET request against a YouTube Data API resource and return the JSON body.
+    Transient failures are retried with backoff. When a cache is given, responses are
+    stored with their ETag and revalidated with If-None-Match, so unchanged resources
+    are reused from the cache.
+    """
+    cache_key = f"{resource}?{urlencode(sorted(params.items()))}"
+    cached = cache.get(cache_key) if cache is not None else None
+    headers = {'If-None-Match': cached[0]} if cached else {}
+    
+    for attempt in range(MAX_ATTEMPTS):
+        last_attempt = attempt == MAX_ATTEMPTS - 1
+        try:
+            response = await client.get(f'{API_BASE_URL}/{resource}', params={**params, 'key': api_key}, headers=headers)
+        except httpx.TransportError as e:
+            if last_attempt:
+                raise
+            delay = get_retry_delay(attempt)
+            print(f"Retrying {resource} request in {delay:.1f}s after error: {str(e)}")
+            await asyncio.sleep(delay)
+            continue
+        
+        if not is_retryable(response) or last_attempt:
+            break
+        
+        # Give up with the API error rather than wait for a long Retry-After
+        delay = get_retry_delay(attempt, response)
+        if delay > MAX_RETRY_DELAY:
+            break
+        
+        print(f"Retrying {resource} request in {delay:.1f}s after HTTP {response.status_code}")
+        await asyncio.sleep(delay)
+    
+    if cached and response.status_code == 304:
+        return cached[1]
+    
+    if response.is_error:
+        raise YouTubeAPIError(response.status_code, *get_api_error(response))
+    
+    data = orjson.loads(response.content)
+    etag = response.headers.get('ETag')
+    
+    if cache is not None and etag:
+        cache[cache_key] = (etag, data)
+    
+    return data
+
+async def lookup_channel_by_username(client, api_key, channel_username):
+    """
+    Look up a channel ID through the legacy username
+    """
+    response = await api_get(client, api_key, 'channels', {
+        'part': 'id',
+        'forUsername': channel_username,
+        'fields': 'items/id'
+    })
+    
+    if response.get('items'):
+        return response['items'][0]['id']
+
+async def lookup_channel_by_search(client, api_key, channel_username):
+    """
+    Look up a channel ID through a channel search
+    """
+    response = await api_get(client, api_key, 'search', {
+        'part': 'snippet',
+        'q': channel_username,
+        'type': 'channel',
+        'maxResults': 1,
+        'fields': 'items/snippet/channelId'
+    })
+    
+    if response.get('items'):
+        return response['items'][0]['snippet']['channelId']
+
+async def get_channel_id(client, api_key, channel_url):
+    """
+    Get channel ID by running the username lookup and the channel search concurrently.
+    The exact username match is preferred, and the search is only used when it finds nothing.
+    """
+    _, _, channel_username = channel_url.partition('@')
+    if not channel_username:
+        raise ValueError(f"Could not extract channel username from {channel_url}")
+    
+    lookups = (
+        asyncio.create_task(lookup_channel_by_username(client, api_key, channel_username)),
+        asyncio.create_task(lookup_channel_by_search(client, api_key, channel_username))
+    )
+    
+    errors = []
+    try:
+        for lookup in lookups:
+            try:
+                channel_id = await lookup
+            except (YouTubeAPIError, httpx.TransportError) as e:
+                errors.append(e)
+                continue
+            
+            if channel_id:
+                return channel_id
+    finally:
+        for lookup in lookups:
+            if not lookup.done():
+                # Cancel the search when the username lookup already found the channel
+                lookup.cancel()
+            elif not lookup.cancelled():
+                # Mark errors of lookups that are no longer needed as retrieved
+                lookup.exception()
+    
+    # A bad key or exhausted quota is not the same as a missing channel
+    if errors:
+        raise errors[0]
+    
+    raise ValueError(f"Could not find channel ID for {channel_url}")
+
+async def get_channel_info(client, api_key, channel_id, cache=None):
+    """
+    Get detailed channel information
+    """
+    response = await api_get(client, api_key, 'channels', {
+        'part': 'snippet,statistics,contentDetails',
+        'id': channel_id,
+        'fields': 'items(id,snippet(title,description,customUrl,publishedAt,country),statistics,contentDetails/relatedPlaylists/uploads)'
+    }, cache)
+    
+    if not response.get('items'):
+        raise ValueError("Could not fetch channel information")
+        
+    channel_data = response['items'][0]
+    return {
+        'title': channel_data['snippet']['title'],
+        'description': channel_data['snippet']['description'],
+        'customUrl': channel_data['snippet'].get('customUrl', 'N/A'),
+        'publishedAt': channel_data['snippet']['publishedAt'],
+        'viewCount': channel_data['statistics']['viewCount'],
+        'subscriberCount': channel_data['statistics']['subscriberCount'],
+        'videoCount': channel_data['statistics']['videoCount'],
+        'country': channel_data['snippet'].get('country', 'N/A'),
+        'uploadsPlaylistId': channel_data['contentDetails']['relatedPlaylists']['uploads']
+    }
+
+async def fetch_page(client, api_key, playlist_id, page_token=None, cache=None):
+    """
+    Fetch a single page of playlist items from the YouTube Data API
+    """
+    params = {
+        'part': 'snippet',
+        'playlistId': playlist_id,
+        'maxResults': 50,
+        'fields': 'nextPageToken,items(snippet(title,description,publishedAt,resourceId/videoId))'
+    }
+    if page_token:
+        params['pageToken'] = page_token
+    
+    return await api_get(client, api_key, 'playlistItems', params, cache)
+
+async def produce_pages(client, api_key, playlist_id, queue, cache=None):
+    """
+    Follow the playlist page tokens and push each page onto the queue.
+    A None sentinel is queued once there are no more pages or fetching
+    failed, in which case awaiting the task raises the error.
+    """
+    next_page_token = None
+    try:
+        while True:
+            page = await fetch_page(client, api_key, playlist_id, next_page_token, cache)
+            await queue.put(page)
+            
+            next_page_token = page.get('nextPageToken')
+            if not next_page_token:
+                break
+    finally:
+        await queue.put(None)